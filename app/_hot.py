@@ -0,0 +1,49 @@
+"""
+Derivation helpers run on every pipeline pass.
+
+Each helper works on whole columns with numpy, so there are no per-row
+Python loops here.
+"""
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+def derive_date_amount_fields(dates: np.ndarray, amounts: np.ndarray) -> Tuple[np.ndarray, ...]:
+    """Compute year, month, year_month, abs_amount and is_income from raw arrays.
+
+    Works on datetime64/float64 arrays directly: year and month both come
+    from a single months-since-epoch conversion instead of separate .dt passes.
+    Missing dates give missing year, month and year_month (nullable Int32
+    arrays), so those rows stay out of every monthly groupby.
+    """
+    missing = np.isnat(dates)
+    months_since_epoch = np.where(missing, 0, dates.astype('M8[M]').astype(np.int64))
+    year_month = (months_since_epoch + 1970 * 12).astype(np.int32)
+    year = year_month // 12
+    month = year_month % 12 + 1
+
+    if missing.any():
+        year, month, year_month = (pd.arrays.IntegerArray(values, missing.copy())
+                                   for values in (year, month, year_month))
+
+    return year, month, year_month, np.abs(amounts), amounts > 0
+
+
+def format_year_month(year_month: pd.Series) -> pd.Series:
+    """Decode integer year_month keys (year * 12 + month - 1) to YYYY-MM strings (missing stay missing)."""
+    missing = year_month.isna().to_numpy()
+    months_since_epoch = year_month.to_numpy(dtype=np.int64, na_value=1970 * 12) - 1970 * 12
+    formatted = np.datetime_as_string(months_since_epoch.astype('M8[M]')).astype(object)
+    formatted[missing] = np.nan
+    return pd.Series(formatted, index=year_month.index)
+
+
+def source_to_group(account_groups: Dict[str, List[str]]) -> Dict[str, str]:
+    """Map each source to its account group (later groups win, e.g. 'all')."""
+    mapping: Dict[str, str] = {}
+    for group_name, sources in account_groups.items():
+        for source in sources:
+            mapping[source] = group_name
+    return mapping
@@ -1,18 +1,87 @@
 """
 Data loaders for different expense data sources.
 """
+import csv
+import hashlib
+import numpy as np
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from abc import ABC, abstractmethod
 from .constants import SourceIds, AccountOwners, SourceFolders
 
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+
+# Upper bound on threads used to read CSV files within a single loader
+MAX_READ_WORKERS = 8
+
+# Bump when the cached (raw, pre-standardization) layout changes
+CACHE_VERSION = 3
+
+# Free-text columns stored as Arrow strings (contiguous buffers instead of Python objects)
+STRING_COLUMNS = ['merchant', 'type', 'category', 'source_file']
+
+
+def _parse_mdy(s: pd.Series) -> pd.Series:
+    """Parse MM/DD/YYYY date strings with vectorized byte arithmetic.
+    
+    Falls back to pd.to_datetime (and its error reporting) for anything
+    that isn't a well-formed, valid date.
+    """
+    try:
+        raw = s.to_numpy().astype('S11')
+    except (UnicodeEncodeError, ValueError):
+        return pd.to_datetime(s, format='%m/%d/%Y')
+    
+    b = raw.view(np.uint8).reshape(-1, 11)
+    digits = b[:, [0, 1, 3, 4, 6, 7, 8, 9]].astype(np.int64) - ord('0')
+    well_formed = (
+        (b[:, 2] == ord('/')) & (b[:, 5] == ord('/')) & (b[:, 10] == 0) &
+        ((digits >= 0) & (digits <= 9)).all(axis=1)
+    )
+    if not well_formed.all():
+        return pd.to_datetime(s, format='%m/%d/%Y')
+    
+    months = digits[:, 0] * 10 + digits[:, 1]
+    days = digits[:, 2] * 10 + digits[:, 3]
+    years = digits[:, 4] * 1000 + digits[:, 5] * 100 + digits[:, 6] * 10 + digits[:, 7]
+    
+    month_start = (years - 1970).astype('M8[Y]').astype('M8[M]') + (months - 1).astype('m8[M]')
+    dates = month_start.astype('M8[D]') + (days - 1).astype('m8[D]')
+    
+    # Reject month 13, day 0, Feb 30 etc. (they would silently roll over)
+    valid = (months >= 1) & (months <= 12) & (days >= 1) & (dates.astype('M8[M]') == month_start)
+    if not valid.all():
+        return pd.to_datetime(s, format='%m/%d/%Y')
+    
+    return pd.Series(dates.astype('M8[ns]'), index=s.index)
+
 
 class DataLoader(ABC):
     """Base class for data loaders."""
     
-    def __init__(self, folder_path: str):
+    # Raw column holding the amount; parsed straight to float64 by the pyarrow reader
+    amount_column = None
+    
+    def __init__(self, folder_path: str, use_pyarrow: bool = True, cache_folder: Optional[Path] = None,
+                 keep_source_file: bool = False):
         self.folder_path = Path(folder_path)
+        # source_file is only provenance, so it is dropped unless asked for
+        self.keep_source_file = keep_source_file
+        # Fall back to the pandas parser when pyarrow isn't installed
+        self.use_pyarrow = use_pyarrow and PYARROW_AVAILABLE
+        # Parsed CSVs are cached as Parquet, which also needs pyarrow
+        self.cache_folder = Path(cache_folder) if cache_folder and PYARROW_AVAILABLE else None
+        # Cache entries read or written by this loader (see _prune_cache)
+        self.used_cache_paths = set()
         
     @abstractmethod
     def load_data(self) -> pd.DataFrame:
@@ -25,62 +94,161 @@ class DataLoader(ABC):
         if not csv_files:
             raise FileNotFoundError(f"No CSV files found in {self.folder_path}")
         
-        dfs = []
-        for file in csv_files:
-            df = pd.read_csv(file, dtype=str)  # Load all columns as strings to avoid parsing issues
-            df['source_file'] = file.name
-            dfs.append(df)
+        # Parsing releases the GIL, so files are read concurrently (map keeps file order)
+        with ThreadPoolExecutor(max_workers=min(MAX_READ_WORKERS, len(csv_files))) as executor:
+            parsed = list(executor.map(self._read_csv_file, csv_files))
+        
+        if self.use_pyarrow:
+            # Concatenate in Arrow and convert to pandas only once; strings stay Arrow-backed
+            # (no Python objects), see _finish
+            table = pa.concat_tables(parsed, promote_options='default')
+            return table.to_pandas(types_mapper={pa.string(): pd.ArrowDtype(pa.string())}.get)
+        
+        return pd.concat(parsed, ignore_index=True)
+    
+    def _read_csv_file(self, file: Path):
+        """Read a CSV file, tagging rows with source_file if requested."""
+        data = self._read_csv_file_cached(file)
+        if not self.keep_source_file:
+            return data
+        
+        if self.use_pyarrow:
+            return data.append_column('source_file', pa.array([file.name] * data.num_rows, pa.string()))
+        
+        return data.assign(source_file=file.name)
+    
+    def _read_csv_file_cached(self, file: Path):
+        """Read a CSV file, reusing the Parquet cache when the file is unchanged."""
+        reader = self._read_csv_arrow if self.use_pyarrow else self._read_csv_pandas
+        if self.cache_folder is None:
+            return reader(file)
+        
+        cache_path = self.cache_folder / f"{self._cache_prefix()}-{self._cache_key(file)}.parquet"
+        self.used_cache_paths.add(cache_path)
+        if cache_path.exists():
+            return pq.read_table(cache_path) if self.use_pyarrow else pd.read_parquet(cache_path)
+        
+        data = reader(file)
+        
+        # Write to a temp file first so an interrupted run can't leave a truncated cache entry
+        self.cache_folder.mkdir(parents=True, exist_ok=True)
+        tmp_path = cache_path.with_suffix('.tmp')
+        if self.use_pyarrow:
+            pq.write_table(data, tmp_path, compression='zstd')
+        else:
+            data.to_parquet(tmp_path, compression='zstd', index=False)
+        tmp_path.replace(cache_path)
+        
+        return data
+    
+    def _cache_prefix(self) -> str:
+        """Prefix shared by the cache entries of this loader's data folder."""
+        return hashlib.blake2b(str(self.folder_path.resolve()).encode()).hexdigest()[:16]
+    
+    def _cache_key(self, file: Path) -> str:
+        """Cache key for a CSV file; changes whenever the file is modified."""
+        stat = file.stat()
+        # The pyarrow and pandas readers cache different column types
+        reader = 'arrow' if self.use_pyarrow else 'pandas'
+        key = f"{CACHE_VERSION}:{reader}:{file.resolve()}:{stat.st_mtime_ns}:{stat.st_size}"
+        return hashlib.blake2b(key.encode()).hexdigest()[:16]
+    
+    def _read_csv_pandas(self, file: Path) -> pd.DataFrame:
+        """Read a CSV file with pandas."""
+        return pd.read_csv(file, dtype=str)  # Load all columns as strings to avoid parsing issues
+    
+    def _read_csv_arrow(self, file: Path) -> "pa.Table":
+        """Read a CSV file into an Arrow table (amount as float64, everything else as strings)."""
+        with open(file, newline='') as f:
+            header = next(csv.reader(f), [])
+        convert_options = pacsv.ConvertOptions(
+            column_types={name: pa.float64() if name == self.amount_column else pa.string()
+                          for name in header},
+            strings_can_be_null=True
+        )
+        
+        try:
+            table = pacsv.read_csv(file, convert_options=convert_options)
+        except pa.ArrowInvalid:
+            # Rows wider than the header (Chase checking's trailing comma) need pandas' column shift
+            table = pa.Table.from_pandas(pd.read_csv(file, dtype=str), preserve_index=False)
+            if self.amount_column in table.column_names:
+                index = table.column_names.index(self.amount_column)
+                table = table.set_column(index, self.amount_column,
+                                         table[self.amount_column].cast(pa.float64()))
+        
+        return table
+    
+    def _finish(self, df_std: pd.DataFrame, df: pd.DataFrame) -> pd.DataFrame:
+        """Carry over source_file (if kept) and store string columns as Arrow strings.
+        
+        Columns taken from the CSVs already are (see _load_csv_files); this only
+        converts the constant ones, such as Chase checking's empty category.
+        """
+        if self.keep_source_file:
+            df_std['source_file'] = df['source_file']
         
-        return pd.concat(dfs, ignore_index=True)
+        if self.use_pyarrow:
+            string_dtype = pd.ArrowDtype(pa.string())
+            for col in STRING_COLUMNS:
+                if col in df_std.columns and df_std[col].dtype != string_dtype:
+                    df_std[col] = df_std[col].astype(string_dtype)
+        
+        return df_std
 
 
 class ChaseCheckingLoader(DataLoader):
     """Loader for Chase checking account data."""
     
+    amount_column = 'Description'  # Columns are shifted, see load_data
+    
     def load_data(self) -> pd.DataFrame:
         df = self._load_csv_files()
         
         # CSV columns are shifted: Details=date, Posting Date=description, Description=amount, Amount=type, Type=balance
         df_std = pd.DataFrame({
-            'date': pd.to_datetime(df['Details'], format='%m/%d/%Y'),
+            'date': _parse_mdy(df['Details']),
             'merchant': df['Posting Date'],
             'type': df['Amount'],
             'category': pd.NA,  # Chase checking doesn't have category
             'amount': pd.to_numeric(df['Description']),
             'source': SourceIds.CHASE_CHECKING,
-            'account_owner': AccountOwners.SHARED,
-            'source_file': df['source_file']
+            'account_owner': AccountOwners.SHARED
         })
         
-        return df_std
+        return self._finish(df_std, df)
 
 
 class ChaseCreditCardLoader(DataLoader):
     """Loader for Chase credit card data."""
     
+    amount_column = 'Amount'
+    
     def load_data(self) -> pd.DataFrame:
         df = self._load_csv_files()
         
         # Standardize columns to common schema
         df_std = pd.DataFrame({
-            'date': pd.to_datetime(df['Transaction Date'], format='%m/%d/%Y'),
+            'date': _parse_mdy(df['Transaction Date']),
             'merchant': df['Description'],
             'type': df['Type'],
             'category': df['Category'],
             'amount': pd.to_numeric(df['Amount']),
             'source': SourceIds.CHASE_CREDIT_CARD,
-            'account_owner': AccountOwners.SHARED,
-            'source_file': df['source_file']
+            'account_owner': AccountOwners.SHARED
         })
         
-        return df_std
+        return self._finish(df_std, df)
 
 
 class AppleCardLoader(DataLoader):
     """Loader for Apple Card data."""
     
-    def __init__(self, folder_path: str, owner: str):
-        super().__init__(folder_path)
+    amount_column = 'Amount (USD)'
+    
+    def __init__(self, folder_path: str, owner: str, use_pyarrow: bool = True,
+                 cache_folder: Optional[Path] = None, keep_source_file: bool = False):
+        super().__init__(folder_path, use_pyarrow, cache_folder, keep_source_file)
         self.owner = owner
         
     def load_data(self) -> pd.DataFrame:
@@ -88,43 +256,76 @@ class AppleCardLoader(DataLoader):
         
         # Standardize columns to common schema
         df_std = pd.DataFrame({
-            'date': pd.to_datetime(df['Transaction Date'], format='%m/%d/%Y'),
+            'date': _parse_mdy(df['Transaction Date']),
             'merchant': df['Description'],
             'type': df['Type'],
             'category': df['Category'],
             'amount': -pd.to_numeric(df['Amount (USD)']),  # Flip sign to make purchases negative
             'source': SourceIds.apple_card_for_owner(self.owner),
-            'account_owner': self.owner.lower(),
-            'source_file': df['source_file']
+            'account_owner': self.owner.lower()
         })
         
-        return df_std
+        return self._finish(df_std, df)
+
+
+def _load_sorted(loader: DataLoader) -> pd.DataFrame:
+    """Load one source and sort it by date (runs on the loader's worker thread)."""
+    return loader.load_data().sort_values('date', kind='stable')
 
 
-def load_all_data(data_folder: str) -> pd.DataFrame:
+def _prune_cache(loaders: List[DataLoader]) -> None:
+    """Delete the loaders' unused cache entries (left behind by changed or removed CSVs).
+
+    Only entries for the loaders' own data folders are touched, so a cache
+    folder shared with other data folders keeps their entries.
+    """
+    used = set().union(*(loader.used_cache_paths for loader in loaders))
+    for loader in loaders:
+        if loader.cache_folder is None:
+            continue
+        for cache_path in loader.cache_folder.glob(f"{loader._cache_prefix()}-*.parquet"):
+            if cache_path not in used:
+                cache_path.unlink(missing_ok=True)
+
+
+def load_all_data(data_folder: str, cache_folder: Optional[Path] = None,
+                  keep_source_file: bool = False) -> pd.DataFrame:
     """Load data from all sources and combine."""
     data_path = Path(data_folder)
+    options = {'cache_folder': cache_folder, 'keep_source_file': keep_source_file}
     
     loaders = [
-        ChaseCheckingLoader(data_path / SourceFolders.CHASE_CHECKING),
-        ChaseCreditCardLoader(data_path / SourceFolders.CHASE_CREDIT_CARD),
-        AppleCardLoader(data_path / SourceFolders.JOE_APPLE_CARD, "Joe"),
-        AppleCardLoader(data_path / SourceFolders.NIKITA_APPLE_CARD, "Nikita")
+        ChaseCheckingLoader(data_path / SourceFolders.CHASE_CHECKING, **options),
+        ChaseCreditCardLoader(data_path / SourceFolders.CHASE_CREDIT_CARD, **options),
+        AppleCardLoader(data_path / SourceFolders.JOE_APPLE_CARD, "Joe", **options),
+        AppleCardLoader(data_path / SourceFolders.NIKITA_APPLE_CARD, "Nikita", **options)
     ]
     
     all_data = []
-    for loader in loaders:
-        try:
-            data = loader.load_data()
-            all_data.append(data)
-            print(f"Loaded {len(data)} records from {loader.__class__.__name__}")
-        except FileNotFoundError as e:
-            print(f"Warning: {e}")
+    with ThreadPoolExecutor(max_workers=len(loaders)) as executor:
+        futures = [executor.submit(_load_sorted, loader) for loader in loaders]
+        
+        # Collect in loader order so the combined frame is deterministic
+        for loader, future in zip(loaders, futures):
+            try:
+                data = future.result()
+                all_data.append(data)
+                print(f"Loaded {len(data)} records from {loader.__class__.__name__}")
+            except FileNotFoundError as e:
+                print(f"Warning: {e}")
     
     if not all_data:
         raise ValueError("No data loaded from any source")
     
+    # Every source has been read, so any other entry for these folders is stale
+    _prune_cache(loaders)
+    
+    # Each source is already sorted, so a stable (merge-based) sort only has to merge the runs
     combined_df = pd.concat(all_data, ignore_index=True)
-    combined_df = combined_df.sort_values('date').reset_index(drop=True)
+    combined_df = combined_df.sort_values('date', kind='stable').reset_index(drop=True)
+    
+    # Low-cardinality labels: categorical codes are smaller and faster to compare/group
+    for col in ('source', 'account_owner'):
+        combined_df[col] = combined_df[col].astype('category')
     
     return combined_df
@@ -12,9 +12,11 @@ Example:
 """
 import sys
 import argparse
+import pandas as pd
 from pathlib import Path
 from .processor import ExpenseProcessor
 from .report_generator import ReportGenerator
+from .writers import write_csv
 
 
 def main():
@@ -31,9 +33,18 @@ def main():
     parser.add_argument('--verbose', '-v',
                        action='store_true',
                        help='Enable verbose output')
+    parser.add_argument('--no-cache',
+                       action='store_true',
+                       help='Re-parse all CSV files instead of using the Parquet cache')
+    parser.add_argument('--quiet', '-q',
+                       action='store_true',
+                       help='Skip the console summary statistics')
 
     args = parser.parse_args()
 
+    # Filtered frames share buffers with their parent until written to
+    pd.set_option('mode.copy_on_write', True)
+
     # Validate input folder
     data_path = Path(args.data_folder)
     if not data_path.exists():
@@ -44,7 +55,8 @@ def main():
         # Initialize processor
         processor = ExpenseProcessor(
             config_folder=args.config,
-            output_folder=args.output
+            output_folder=args.output,
+            use_cache=not args.no_cache
         )
 
         # Process data
@@ -54,11 +66,11 @@ def main():
             print("Warning: No data to process after filtering")
             return
 
-        df.to_csv('processed_results.csv', index=False)
+        write_csv(processor.format_for_output(df), 'processed_results.csv')
         print(f"\n📄 Final processed data saved to: processed_results.csv")
 
         # Generate reports
-        report_generator = ReportGenerator(processor, args.output)
+        report_generator = ReportGenerator(processor, args.output, quiet=args.quiet)
         report_generator.print_summary_statistics(df)
         report_generator.generate_all_reports(df)
 
@@ -1,22 +1,36 @@
 """
 Main data processor for expense analysis.
 """
+import numpy as np
 import pandas as pd
 import yaml
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, List
+from ._hot import derive_date_amount_fields, format_year_month, source_to_group
 from .data_loaders import load_all_data
-from .rules_engine import RulesEngine
+from .rules_engine import RulesEngine, SafeLoader
+from .writers import PYARROW_AVAILABLE, write_csv, write_parquet
+
+try:
+    import polars as pl
+    import pyarrow  # noqa: F401 - pl.from_pandas needs pyarrow
+    POLARS_AVAILABLE = True
+except ImportError:
+    POLARS_AVAILABLE = False
+
+# Keys of the shared aggregate that every summary rolls up from
+AGGREGATE_KEYS = ['master_category', 'merchant_group', 'account_group', 'transaction_type', 'source']
 
 
 class ExpenseProcessor:
     """Main processor for expense data analysis."""
 
-    def __init__(self, config_folder: str = "config", output_folder: str = "output"):
+    def __init__(self, config_folder: str = "config", output_folder: str = "output", use_cache: bool = True):
         self.config_folder = Path(config_folder)
         self.output_folder = Path(output_folder)
         self.intermediate_folder = self.output_folder / "intermediate"
         self.reports_folder = self.output_folder / "reports"
+        self.cache_folder = self.intermediate_folder / "_cache" if use_cache else None
 
         # Create output directories
         self.intermediate_folder.mkdir(parents=True, exist_ok=True)
@@ -24,7 +38,7 @@ class ExpenseProcessor:
 
         # Load configuration
         self.report_config = self._load_config("report.yaml")
-        self.rules_engine = RulesEngine(config_folder)
+        self.rules_engine = RulesEngine.get(config_folder)
 
     def _load_config(self, filename: str) -> Dict[str, Any]:
         """Load configuration file."""
@@ -33,8 +47,8 @@ class ExpenseProcessor:
             print(f"Warning: {config_path} not found, using defaults")
             return {}
 
-        with open(config_path, 'r') as f:
-            return yaml.safe_load(f)
+        # libyaml's C parser when available, reading the raw bytes (it detects the encoding)
+        return yaml.load(config_path.read_bytes(), Loader=SafeLoader)
 
     def process_data(self, data_folder: str) -> pd.DataFrame:
         """Main processing pipeline."""
@@ -42,7 +56,8 @@ class ExpenseProcessor:
 
         # 1. Load all data
         print("\n1. Loading data...")
-        df = load_all_data(data_folder)
+        keep_source_file = self.report_config.get('output_settings', {}).get('keep_source_file', False)
+        df = load_all_data(data_folder, cache_folder=self.cache_folder, keep_source_file=keep_source_file)
         print(f"Total transactions loaded: {len(df)}")
 
         # 2. Apply exclusions
@@ -75,30 +90,31 @@ class ExpenseProcessor:
         return df
 
     def _add_derived_fields(self, df: pd.DataFrame) -> pd.DataFrame:
-        """Add derived fields for analysis."""
-        result_df = df.copy()
-
-        # Add month, year for time-based analysis
-        result_df['year'] = result_df['date'].dt.year
-        result_df['month'] = result_df['date'].dt.month
-
-        # Add absolute amount for sorting
-        result_df['abs_amount'] = result_df['amount'].abs()
-
-        # Add expense vs income flag
-        result_df['transaction_type'] = result_df['amount'].apply(
-            lambda x: 'Income' if x > 0 else 'Expense'
+        """Add derived fields for analysis (returns a new frame; df is left unchanged)."""
+        year, month, year_month, abs_amount, is_income = derive_date_amount_fields(
+            df['date'].to_numpy(), df['amount'].to_numpy()
         )
 
-        # Add account grouping based on config
+        # Add account grouping based on config (later groups win, e.g. 'all')
         account_groups = self.report_config.get('report_settings', {}).get('account_groups', {})
-        result_df['account_group'] = 'unknown'
-
-        for group_name, sources in account_groups.items():
-            mask = result_df['source'].isin(sources)
-            result_df.loc[mask, 'account_group'] = group_name
+        account_group = df['source'].map(source_to_group(account_groups)).astype(object).fillna('unknown').astype('category')
+
+        return df.assign(
+            # Add month, year for time-based analysis
+            year=year,
+            month=month,
+            # Integer month key for fast grouping; see format_year_month
+            year_month=year_month,
+            # Add absolute amount for sorting
+            abs_amount=abs_amount,
+            # Add expense vs income flag (codes index into the categories)
+            transaction_type=pd.Categorical.from_codes(is_income.astype(np.int8), categories=['Expense', 'Income']),
+            account_group=account_group
+        )
 
-        return result_df
+    def format_for_output(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Return df with internal keys decoded for writing to files."""
+        return df.assign(year_month=format_year_month(df['year_month']))
 
     def _save_intermediate_data(self, df: pd.DataFrame) -> None:
         """Save intermediate processed data."""
@@ -107,33 +123,88 @@ class ExpenseProcessor:
 
         # Save main processed transactions
         processed_file = files.get('processed_transactions', 'processed_transactions.csv')
-        output_path = self.intermediate_folder / processed_file
-        df.to_csv(output_path, index=False)
+        output_path = self._save_intermediate_file(self.format_for_output(df), processed_file)
         print(f"Saved processed transactions to: {output_path}")
 
+        # Both summaries roll up from one aggregate
+        agg = self.compute_aggregates(df)
+
         # Save summary by category
-        category_summary = self._create_category_summary(df)
+        category_summary = self._create_category_summary(df, agg)
         category_file = files.get('category_summary', 'category_summary.csv')
-        category_path = self.intermediate_folder / category_file
-        category_summary.to_csv(category_path, index=False)
+        category_path = self._save_intermediate_file(category_summary, category_file)
         print(f"Saved category summary to: {category_path}")
 
         # Save summary by merchant
-        merchant_summary = self._create_merchant_summary(df)
+        merchant_summary = self._create_merchant_summary(df, agg)
         merchant_file = files.get('merchant_summary', 'merchant_summary.csv')
-        merchant_path = self.intermediate_folder / merchant_file
-        merchant_summary.to_csv(merchant_path, index=False)
+        merchant_path = self._save_intermediate_file(merchant_summary, merchant_file)
         print(f"Saved merchant summary to: {merchant_path}")
 
-    def _create_category_summary(self, df: pd.DataFrame) -> pd.DataFrame:
-        """Create summary by category."""
-        summary = df.groupby(['master_category', 'account_group']).agg({
-            'amount': ['sum', 'count', 'mean'],
-            'abs_amount': 'sum'
-        }).round(2)
+    def _save_intermediate_file(self, df: pd.DataFrame, filename: str) -> Path:
+        """Save one intermediate file in the configured format (csv or parquet)."""
+        output_path = self.intermediate_folder / filename
+        file_format = self.report_config.get('output_settings', {}).get('intermediate_format', 'csv')
+
+        if file_format == 'parquet':
+            if PYARROW_AVAILABLE:
+                output_path = output_path.with_suffix('.parquet')
+                write_parquet(df, output_path)
+                return output_path
+            print("Warning: pyarrow not installed, saving intermediate data as CSV")
+
+        write_csv(df, output_path)
+        return output_path
+
+    def compute_aggregates(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Aggregate amounts once per combination of all summary keys.
+
+        Category, merchant and cashflow summaries roll up from this frame
+        instead of each re-scanning the transactions: compute it once and
+        pass it to them as agg (they compute their own without it).
+        """
+        if POLARS_AVAILABLE:
+            return self._compute_aggregates_polars(df)
+
+        return df.groupby(AGGREGATE_KEYS, observed=True, sort=False, dropna=False).agg(
+            amount_sum=('amount', 'sum'),
+            cnt=('amount', 'count'),
+            abs_sum=('abs_amount', 'sum')
+        )
 
-        # Flatten column names
-        summary.columns = ['total_amount', 'transaction_count', 'avg_amount', 'total_abs_amount']
+    def _compute_aggregates_polars(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Polars version of the aggregate groupby (parallel, columnar)."""
+        pl_df = pl.from_pandas(df[AGGREGATE_KEYS + ['amount', 'abs_amount']])
+        # maintain_order: groups in first-appearance order like pandas' sort=False, so rows that
+        # tie in a later sort come out the same way on every run
+        agg = pl_df.group_by(AGGREGATE_KEYS, maintain_order=True).agg([
+            pl.col('amount').sum().alias('amount_sum'),
+            pl.col('amount').count().alias('cnt'),
+            pl.col('abs_amount').sum().alias('abs_sum')
+        ])
+        result = agg.to_pandas()
+
+        # Polars orders categories by appearance; restore pandas' order (it drives pivot column order).
+        # astype() would be a no-op here: unordered dtypes with the same categories compare equal.
+        for key in AGGREGATE_KEYS:
+            if isinstance(df[key].dtype, pd.CategoricalDtype):
+                result[key] = result[key].astype('category').cat.set_categories(df[key].cat.categories)
+
+        return result.set_index(AGGREGATE_KEYS)
+
+    def _rollup(self, agg: pd.DataFrame, keys: List[str]) -> pd.DataFrame:
+        """Sum aggregates (see compute_aggregates) up to the given keys."""
+        return agg.groupby(level=keys, observed=True, sort=False).sum()
+
+    def _summarize(self, agg: pd.DataFrame, keys: List[str]) -> pd.DataFrame:
+        """Create totals, counts and averages for the given keys."""
+        rolled = self._rollup(agg, keys)
+        summary = pd.DataFrame({
+            'total_amount': rolled['amount_sum'],
+            'transaction_count': rolled['cnt'],
+            'avg_amount': rolled['amount_sum'] / rolled['cnt'],
+            'total_abs_amount': rolled['abs_sum']
+        }).round(2)
         summary = summary.reset_index()
 
         # Sort by total absolute amount
@@ -141,38 +212,52 @@ class ExpenseProcessor:
 
         return summary
 
-    def _create_merchant_summary(self, df: pd.DataFrame) -> pd.DataFrame:
+    def _create_category_summary(self, df: pd.DataFrame, agg: pd.DataFrame = None) -> pd.DataFrame:
+        """Create summary by category."""
+        if agg is None:
+            agg = self.compute_aggregates(df)
+        return self._summarize(agg, ['master_category', 'account_group'])
+
+    def _create_merchant_summary(self, df: pd.DataFrame, agg: pd.DataFrame = None) -> pd.DataFrame:
         """Create summary by merchant."""
-        summary = df.groupby(['merchant_group', 'account_group']).agg({
-            'amount': ['sum', 'count', 'mean'],
-            'abs_amount': 'sum'
-        }).round(2)
+        if agg is None:
+            agg = self.compute_aggregates(df)
+        return self._summarize(agg, ['merchant_group', 'account_group'])
+
+    def get_expense_category_summary(self, df: pd.DataFrame, sources: List[str],
+                                     agg: pd.DataFrame = None) -> pd.DataFrame:
+        """Calculate expense totals by master category for the given sources.
+
+        Pass agg (see compute_aggregates) to reuse an existing aggregate.
+        """
+        if agg is None:
+            agg = self.compute_aggregates(df)
+        mask = ((agg.index.get_level_values('transaction_type') == 'Expense') &
+                agg.index.get_level_values('source').isin(sources))
+
+        summary = agg[mask].groupby(level='master_category', observed=True, sort=False).agg(
+            amount=('amount_sum', 'sum'),
+            abs_amount=('abs_sum', 'sum')
+        )
 
-        # Flatten column names
-        summary.columns = ['total_amount', 'transaction_count', 'avg_amount', 'total_abs_amount']
-        summary = summary.reset_index()
+        # Only categories with at least one negative amount
+        summary = summary[summary['abs_amount'] > 0].round(2)
+        summary = summary.sort_values('abs_amount', ascending=False)
 
-        # Sort by total absolute amount
-        summary = summary.sort_values('total_abs_amount', ascending=False)
+        return summary.reset_index()
 
-        return summary
+    def get_cashflow_summary(self, df: pd.DataFrame, agg: pd.DataFrame = None) -> pd.DataFrame:
+        """Calculate cashflow summary by account group.
 
-    def get_cashflow_summary(self, df: pd.DataFrame) -> pd.DataFrame:
-        """Calculate cashflow summary by account group."""
-        cashflow = df.groupby(['account_group', 'transaction_type']).agg({
-            'amount': 'sum',
-            'abs_amount': 'sum'
-        }).round(2)
+        Pass agg (see compute_aggregates) to reuse an existing aggregate.
+        """
+        if agg is None:
+            agg = self.compute_aggregates(df)
+        amounts = self._rollup(agg, ['account_group', 'transaction_type'])['amount_sum'].round(2)
 
-        cashflow = cashflow.reset_index()
-
-        # Pivot to show income vs expenses
-        cashflow_pivot = cashflow.pivot_table(
-            index='account_group',
-            columns='transaction_type',
-            values='amount',
-            fill_value=0
-        ).round(2)
+        # Already one row per (group, type), so reshape directly to show income vs expenses.
+        # The rollup is unsorted; sort first so columns follow category order, not appearance order.
+        cashflow_pivot = amounts.sort_index().unstack('transaction_type', fill_value=0)
 
         # Add net cashflow
         if 'Income' in cashflow_pivot.columns and 'Expense' in cashflow_pivot.columns:
@@ -180,13 +265,18 @@ class ExpenseProcessor:
 
         return cashflow_pivot.reset_index()
 
-    def get_top_expenses(self, df: pd.DataFrame, n: int = None) -> pd.DataFrame:
-        """Get top N expenses by absolute amount."""
+    def get_top_expenses(self, df: pd.DataFrame, n: int = None,
+                         expenses: pd.DataFrame = None) -> pd.DataFrame:
+        """Get top N expenses by absolute amount.
+
+        Pass expenses (df already filtered to amount < 0) to skip re-filtering.
+        """
         if n is None:
             n = self.report_config.get('report_settings', {}).get('top_n_transactions', 20)
 
         # Filter to expenses only
-        expenses = df[df['amount'] < 0].copy()
+        if expenses is None:
+            expenses = df[df['amount'] < 0]
         expenses = expenses.sort_values('abs_amount', ascending=False)
 
         return expenses.head(n)[['date', 'merchant_group', 'master_category',
@@ -5,13 +5,16 @@ import pandas as pd
 import yaml
 from pathlib import Path
 from typing import Dict, List, Any
+from ._hot import format_year_month
+from .writers import write_csv
 
 
 class ReportGenerator:
     """Generates various reports from processed expense data."""
     
-    def __init__(self, processor, output_folder: str = "output"):
+    def __init__(self, processor, output_folder: str = "output", quiet: bool = False):
         self.processor = processor
+        self.quiet = quiet  # Skip console-only summary statistics
         self.output_folder = Path(output_folder)
         self.reports_folder = self.output_folder / "reports"
         self.reports_folder.mkdir(parents=True, exist_ok=True)
@@ -22,36 +25,42 @@ class ReportGenerator:
         """Generate all reports."""
         print("\n=== Generating Reports ===")
         
+        # Several sections only look at expenses; filter them once
+        expenses = df[df['amount'].to_numpy() < 0]
+        
+        # Cashflow and category summaries roll up from one aggregate
+        agg = self.processor.compute_aggregates(df)
+        
         # 1. Cashflow summary
         print("Generating cashflow summary...")
-        cashflow = self.processor.get_cashflow_summary(df)
+        cashflow = self.processor.get_cashflow_summary(df, agg)
         self._save_report(cashflow, "cashflow_summary.csv")
         self._print_cashflow_summary(cashflow)
         
         # 2. Top expenses
         print("\nGenerating top expenses...")
-        top_expenses = self.processor.get_top_expenses(df)
+        top_expenses = self.processor.get_top_expenses(df, expenses=expenses)
         self._save_report(top_expenses, "top_expenses.csv")
         self._print_top_expenses(top_expenses)
         
         # 3. Category analysis by account group
         print("\nGenerating category analysis...")
-        self._generate_category_reports(df)
+        self._generate_category_reports(df, agg)
         
         # 4. Merchant analysis by account group
         print("\nGenerating merchant analysis...")
-        self._generate_merchant_reports(df)
+        self._generate_merchant_reports(expenses)
         
         # 5. Monthly trends
         print("\nGenerating monthly trends...")
-        self._generate_monthly_reports(df)
+        self._generate_monthly_reports(df, expenses)
         
         print(f"\n=== All reports saved to: {self.reports_folder} ===")
     
     def _save_report(self, df: pd.DataFrame, filename: str) -> None:
         """Save report to CSV file."""
         output_path = self.reports_folder / filename
-        df.to_csv(output_path, index=False)
+        write_csv(df, output_path)
         print(f"Saved: {output_path}")
     
     def _print_cashflow_summary(self, cashflow_df: pd.DataFrame) -> None:
@@ -65,8 +74,8 @@ class ReportGenerator:
         display_df = top_expenses_df.head(n)[['date', 'merchant_group', 'amount', 'master_category', 'account_group']]
         print(display_df.to_string(index=False))
     
-    def _generate_category_reports(self, df: pd.DataFrame) -> None:
-        """Generate category analysis reports by account group."""
+    def _generate_category_reports(self, df: pd.DataFrame, agg: pd.DataFrame) -> None:
+        """Generate category analysis reports by account group (agg: see compute_aggregates)."""
         report_settings = self.config.get('report_settings', {})
         account_groups = report_settings.get('account_groups', {})
         top_n = report_settings.get('top_n_categories', 10)
@@ -75,22 +84,9 @@ class ReportGenerator:
             if group_name == 'all':
                 continue  # Skip 'all' group to avoid duplication
                 
-            # Filter data for this account group
-            group_df = df[df['source'].isin(sources)].copy()
-            
-            if len(group_df) == 0:
-                continue
-            
-            # Category summary for expenses only
-            expenses = group_df[group_df['amount'] < 0].copy()
-            if len(expenses) > 0:
-                category_summary = expenses.groupby('master_category').agg({
-                    'amount': 'sum',
-                    'abs_amount': 'sum'
-                }).round(2)
-                category_summary = category_summary.sort_values('abs_amount', ascending=False)
-                category_summary = category_summary.reset_index()
-                
+            # Category summary for expenses only (rolled up from the processor's aggregates)
+            category_summary = self.processor.get_expense_category_summary(df, sources, agg)
+            if len(category_summary) > 0:
                 # Save top categories
                 filename = f"top_categories_{group_name}.csv"
                 self._save_report(category_summary.head(top_n), filename)
@@ -101,8 +97,8 @@ class ReportGenerator:
                 display_df.columns = ['Category', 'Total_Spent', 'Absolute_Amount']
                 print(display_df.to_string(index=False))
     
-    def _generate_merchant_reports(self, df: pd.DataFrame) -> None:
-        """Generate merchant analysis reports by account group."""
+    def _generate_merchant_reports(self, expenses_df: pd.DataFrame) -> None:
+        """Generate merchant analysis reports by account group (from expense rows)."""
         report_settings = self.config.get('report_settings', {})
         account_groups = report_settings.get('account_groups', {})
         top_n = report_settings.get('top_n_merchants', 15)
@@ -112,23 +108,17 @@ class ReportGenerator:
             if group_name == 'all':
                 continue
                 
-            # Filter data for this account group
-            group_df = df[df['source'].isin(sources)].copy()
-            
-            if len(group_df) == 0:
-                continue
-            
-            # Merchant summary for expenses only, above minimum amount
+            # Merchant summary for this account group's expenses, above minimum amount
             # Exclude fixed/structural categories: Housing, Debt, Childcare, Savings
             excluded_categories = ['Home & Garden', 'Debt Payments', 'Childcare', 'Savings']
-            expenses = group_df[
-                (group_df['amount'] < 0) & 
-                (group_df['abs_amount'] >= min_amount) &
-                (~group_df['master_category'].isin(excluded_categories))
-            ].copy()
+            expenses = expenses_df[
+                expenses_df['source'].isin(sources) &
+                (expenses_df['abs_amount'] >= min_amount) &
+                (~expenses_df['master_category'].isin(excluded_categories))
+            ]
             
             if len(expenses) > 0:
-                merchant_summary = expenses.groupby('merchant_group').agg({
+                merchant_summary = expenses.groupby('merchant_group', observed=True, sort=False).agg({
                     'amount': 'sum',
                     'abs_amount': ['sum', 'count']
                 }).round(2)
@@ -149,52 +139,47 @@ class ReportGenerator:
                 display_df.columns = ['Merchant', 'Total_Spent', 'Transactions']
                 print(display_df.to_string(index=False))
     
-    def _generate_monthly_reports(self, df: pd.DataFrame) -> None:
+    def _generate_monthly_reports(self, df: pd.DataFrame, expenses_df: pd.DataFrame) -> None:
         """Generate monthly trend reports."""
-        # Create year_month on the fly
-        df_monthly = df.copy()
-        df_monthly['year_month'] = df_monthly['date'].dt.to_period('M')
-        
+        # year_month is an integer key from _add_derived_fields; decoded to YYYY-MM for output
         # Monthly spending by category
-        monthly_categories = df_monthly[df_monthly['amount'] < 0].groupby(['year_month', 'master_category']).agg({
+        monthly_categories = expenses_df.groupby(['year_month', 'master_category'], observed=True).agg({
             'amount': 'sum',
             'abs_amount': 'sum'
         }).round(2)
         
         monthly_categories = monthly_categories.reset_index()
+        monthly_categories['year_month'] = format_year_month(monthly_categories['year_month'])
         self._save_report(monthly_categories, "monthly_spending_by_category.csv")
         
         # Monthly totals by account group
-        monthly_totals = df_monthly.groupby(['year_month', 'account_group', 'transaction_type']).agg({
+        monthly_totals = df.groupby(['year_month', 'account_group', 'transaction_type'], observed=True).agg({
             'amount': 'sum'
         }).round(2)
         
         monthly_totals = monthly_totals.reset_index()
+        monthly_totals['year_month'] = format_year_month(monthly_totals['year_month'])
         self._save_report(monthly_totals, "monthly_totals_by_account.csv")
         
         # Overall monthly summary
-        monthly_summary = df_monthly.groupby(['year_month', 'transaction_type']).agg({
-            'amount': 'sum'
-        }).round(2)
-        
-        monthly_pivot = monthly_summary.reset_index().pivot_table(
-            index='year_month',
-            columns='transaction_type', 
-            values='amount',
-            fill_value=0
-        ).round(2)
+        monthly_summary = df.groupby(['year_month', 'transaction_type'], observed=True)['amount'].sum().round(2)
+        monthly_pivot = monthly_summary.unstack('transaction_type', fill_value=0)
         
         if 'Income' in monthly_pivot.columns and 'Expense' in monthly_pivot.columns:
             monthly_pivot['Net_Cashflow'] = monthly_pivot['Income'] + monthly_pivot['Expense']
         
         monthly_pivot = monthly_pivot.reset_index()
+        monthly_pivot['year_month'] = format_year_month(monthly_pivot['year_month'])
         self._save_report(monthly_pivot, "monthly_cashflow_summary.csv")
         
         print("\n--- MONTHLY CASHFLOW TRENDS ---")
         print(monthly_pivot.to_string(index=False))
     
     def print_summary_statistics(self, df: pd.DataFrame) -> None:
-        """Print high-level summary statistics."""
+        """Print high-level summary statistics (skipped when quiet)."""
+        if self.quiet:
+            return
+        
         print("\n=== SUMMARY STATISTICS ===")
         
         total_transactions = len(df)
@@ -204,8 +189,9 @@ class ReportGenerator:
         print(f"Date Range: {date_range}")
         
         # Income vs Expenses
-        income = df[df['amount'] > 0]['amount'].sum()
-        expenses = df[df['amount'] < 0]['amount'].sum()
+        amounts = df['amount'].to_numpy()
+        income = amounts[amounts > 0].sum()
+        expenses = amounts[amounts < 0].sum()
         net = income + expenses
         
         print(f"\nTotal Income: ${income:,.2f}")
@@ -214,12 +200,12 @@ class ReportGenerator:
         
         # By account group
         print(f"\nBy Account Group:")
-        account_summary = df.groupby('account_group')['amount'].sum().round(2)
+        account_summary = df.groupby('account_group', observed=True, sort=False)['amount'].sum().round(2)
         for account, amount in account_summary.items():
             print(f"  {account}: ${amount:,.2f}")
         
         # Transaction sources
         print(f"\nTransactions by Source:")
-        source_counts = df['source'].value_counts()
+        source_counts = df.groupby('source', observed=True, sort=False).size().sort_values(ascending=False)
         for source, count in source_counts.items():
             print(f"  {source}: {count:,}")
\ No newline at end of file
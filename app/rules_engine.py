@@ -1,15 +1,259 @@
 """
 Rules engine for processing expense data.
 """
+import functools
+import numpy as np
 import pandas as pd
 import yaml
 from pathlib import Path
-from typing import Dict, List, Any
+from typing import Callable, Dict, List, Any, NamedTuple, Optional, Tuple
 import re
 
+try:
+    from yaml import CSafeLoader as SafeLoader  # libyaml C parser
+except ImportError:
+    from yaml import SafeLoader
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+
+@functools.lru_cache(maxsize=None)
+def _load_yaml_cached(path: str, mtime_ns: int, size: int) -> Dict[str, Any]:
+    """Parse a YAML file; mtime/size are part of the key so edits invalidate it.
+    
+    The parsed dict is shared between callers and must not be modified.
+    """
+    # Raw bytes: the parser detects the encoding itself, without a text-mode wrapper
+    return yaml.load(Path(path).read_bytes(), Loader=SafeLoader)
+
+
+# Files a RulesEngine is built from (see RulesEngine.get)
+CONFIG_FILES = ['exclusions.yaml', 'rules.yaml', 'category_mapping.yaml']
+
+# Rule conditions that compare a column for equality (stored as categoricals, see RulesEngine._prepare)
+EQUALITY_FIELDS = ['source', 'type', 'category']
+
+
+# Characters that make a description pattern more than a plain substring
+REGEX_METACHARACTERS = re.compile(r'[.\\^$*+?()\[\]{}|]')
+
+
+class _Rule(NamedTuple):
+    """Rule conditions compiled once from the YAML config."""
+    equals: Dict[str, Any]  # Column -> required value
+    pattern: Optional[re.Pattern]  # description_contains, case-insensitive
+    literal: Optional[str]  # Lowercased description_contains when it has no regex syntax
+    amount_min: float
+    amount_max: float
+
+
+def _compile_conditions(conditions: Dict[str, Any], amounts: bool = True) -> _Rule:
+    """Compile rule conditions (amount bounds only where the rule type supports them)."""
+    equals = {field: conditions[field] for field in EQUALITY_FIELDS if field in conditions}
+    pattern = conditions.get('description_contains')
+    return _Rule(
+        equals=equals,
+        pattern=re.compile(pattern, re.IGNORECASE) if pattern is not None else None,
+        literal=pattern.lower() if pattern is not None and not REGEX_METACHARACTERS.search(pattern) else None,
+        amount_min=conditions.get('amount_min', -np.inf) if amounts else -np.inf,
+        amount_max=conditions.get('amount_max', np.inf) if amounts else np.inf
+    )
+
+
+class _RuleSet(NamedTuple):
+    """Compiled rules grouped by condition, so _match_rules visits only the rules each one applies to."""
+    rules: List[_Rule]
+    equals: List[Tuple[str, np.ndarray, List[Any]]]  # (field, rule indices, required values)
+    bounds: List[Tuple[Callable, np.ndarray, np.ndarray]]  # (comparison, rule indices, amount bounds)
+    searched: np.ndarray  # Indices of rules with a description pattern
+    prefilter: Optional[re.Pattern]  # See _combine_patterns
+
+
+def _group_rules(rules: List[_Rule], fields: List[str]) -> _RuleSet:
+    """Group rules once by which of fields and amount bounds they constrain."""
+    equals = []
+    for field in fields:
+        constrained = [i for i, rule in enumerate(rules) if field in rule.equals]
+        if constrained:
+            equals.append((field, np.array(constrained, dtype=np.intp),
+                           [rules[i].equals[field] for i in constrained]))
+
+    bounds = []
+    for bound, compare in (('amount_min', np.greater_equal), ('amount_max', np.less_equal)):
+        limited = [i for i, rule in enumerate(rules) if np.isfinite(getattr(rule, bound))]
+        if limited:
+            bounds.append((compare, np.array(limited, dtype=np.intp),
+                           np.array([getattr(rules[i], bound) for i in limited], dtype=float)))
+
+    return _RuleSet(
+        rules=rules,
+        equals=equals,
+        bounds=bounds,
+        searched=np.array([i for i, rule in enumerate(rules) if rule.pattern is not None], dtype=np.intp),
+        prefilter=_combine_patterns([rule.pattern for rule in rules])
+    )
+
+
+def _combine_patterns(patterns: List[Optional[re.Pattern]]) -> Optional[re.Pattern]:
+    """One case-insensitive alternation matching wherever any of the patterns would.
+
+    Returns None when there is nothing to combine, or when a pattern uses
+    backreferences (group numbers shift once patterns are joined).
+    """
+    sources = [p.pattern for p in patterns if p is not None]
+    if not sources or any(re.search(r'\\\d|\(\?P=', source) for source in sources):
+        return None
+
+    try:
+        return re.compile('|'.join(f'(?:{source})' for source in sources), re.IGNORECASE)
+    except re.error:  # e.g. duplicate group names or inline global flags
+        return None
+
+
+def _dictionary(column: pd.Series, rows: np.ndarray) -> Tuple[np.ndarray, Any]:
+    """Dictionary-encode the values at rows as (codes, lowercased distinct values).
+
+    Distinct values are an Arrow array for Arrow-backed strings, else a numpy
+    object array; both support .take(positions) for searching a subset of them.
+    Missing values get code len(values). Lowercasing once here lets every
+    literal pattern compare case-sensitively.
+    """
+    if PYARROW_AVAILABLE and isinstance(column.dtype, pd.ArrowDtype) and pa.types.is_string(column.dtype.pyarrow_dtype):
+        values = pa.array(column.array).take(rows)
+        if isinstance(values, pa.ChunkedArray):
+            values = values.combine_chunks()  # Large CSVs are read as several chunks
+        encoded = values.dictionary_encode()
+        codes = encoded.indices.fill_null(len(encoded.dictionary)).to_numpy(zero_copy_only=False)
+        return codes, pc.utf8_lower(encoded.dictionary)
+
+    codes, uniques = pd.factorize(column.to_numpy()[rows])
+    codes[codes < 0] = len(uniques)
+    return codes, np.array([v.lower() if isinstance(v, str) else v for v in uniques], dtype=object)
+
+
+def _search(pattern: re.Pattern, values) -> np.ndarray:
+    """Boolean array of values the pattern matches (missing values never match).
+
+    Arrow string arrays are matched by pyarrow's regex kernel, without creating
+    Python strings; patterns RE2 can't handle (e.g. lookarounds) fall back to re.
+    """
+    if PYARROW_AVAILABLE and isinstance(values, pa.Array):
+        try:
+            matched = pc.match_substring_regex(values, pattern=pattern.pattern, ignore_case=True)
+            return matched.fill_null(False).to_numpy(zero_copy_only=False)
+        except pa.ArrowInvalid:
+            values = values.to_numpy(zero_copy_only=False)
+
+    search = pattern.search
+    return np.fromiter((isinstance(v, str) and search(v) is not None for v in values),
+                       dtype=bool, count=len(values))
+
+
+def _contains(literal: str, values) -> np.ndarray:
+    """Like _search, for a lowercase plain substring in lowercased values: no regex engine involved."""
+    if PYARROW_AVAILABLE and isinstance(values, pa.Array):
+        matched = pc.match_substring(values, pattern=literal)
+        return matched.fill_null(False).to_numpy(zero_copy_only=False)
+
+    return np.fromiter((isinstance(v, str) and literal in v for v in values),
+                       dtype=bool, count=len(values))
+
+
+def _match_rules(df: pd.DataFrame, rule_set: _RuleSet) -> np.ndarray:
+    """Evaluate all rules at once; column i of the result is rule i's row mask.
+
+    Each condition column is read once for every rule that uses it: equality
+    checks compare categorical codes against all rules' values in one
+    broadcast, and amount bounds likewise. Descriptions are searched last,
+    only on rows still matching (and matching the prefilter, if any), and once
+    per distinct merchant rather than once per row.
+
+    Rules requiring a value that no row has are skipped outright: their
+    columns stay False and none of their other conditions are evaluated.
+    """
+    rules, prefilter = rule_set.rules, rule_set.prefilter
+    live = np.ones(len(rules), dtype=bool)
+
+    equals = []
+    for field, constrained, values in rule_set.equals:
+        column = df[field]
+        codes = column.cat.codes.to_numpy()
+        wanted = column.cat.categories.get_indexer(values)
+        # Which categories occur in df (codes are shifted by one past missing values' -1);
+        # the trailing False is looked up by values that aren't categories at all
+        observed = np.append(np.bincount(codes + 1, minlength=len(column.cat.categories) + 1)[1:] > 0, False)
+        live[constrained] &= observed[wanted]
+        equals.append((codes, constrained, wanted))
+
+    matches = np.zeros((len(df), len(rules)), dtype=bool, order='F')
+    matches[:, live] = True
+
+    for codes, constrained, wanted in equals:
+        keep = live[constrained]
+        if keep.any():
+            matches[:, constrained[keep]] &= codes[:, None] == wanted[keep]
+
+    # Each bound is compared only for the rules that set it: one comparison matrix per bound,
+    # instead of comparing both (mostly infinite) bounds and combining the two temporaries
+    if rule_set.bounds:
+        amounts = df['amount'].to_numpy()[:, None]
+        for compare, limited, limits in rule_set.bounds:
+            keep = live[limited]
+            if keep.any():
+                matches[:, limited[keep]] &= compare(amounts, limits[keep])
+
+    searched = rule_set.searched[live[rule_set.searched]]
+    if len(searched):
+        # Only rows some pattern could still apply to are read, and their distinct merchants
+        # are lowercased once for all rules. A trailing False entry covers missing merchants
+        candidates = np.flatnonzero(matches[:, searched].any(axis=1))
+        codes, merchants = _dictionary(df['merchant'], candidates)
+        if prefilter is not None:
+            # One combined scan of the candidates' merchants
+            hits = np.append(_search(prefilter, merchants), False)
+            matches[np.ix_(candidates[~hits[codes]], searched)] = False
+        for i in searched:
+            positions = np.flatnonzero(matches[candidates, i])
+            needed = np.zeros(len(merchants) + 1, dtype=bool)
+            needed[codes[positions]] = True
+            names = np.flatnonzero(needed[:-1])
+
+            hits = np.zeros(len(merchants) + 1, dtype=bool)
+            if rules[i].literal is not None:
+                hits[names] = _contains(rules[i].literal, merchants.take(names))
+            else:
+                hits[names] = _search(rules[i].pattern, merchants.take(names))
+            matches[candidates[positions], i] = hits[codes[positions]]
+
+    return matches
+
+
+def _file_stamp(path: Path) -> Optional[Tuple[int, int]]:
+    """(mtime_ns, size) of a file, or None if it doesn't exist."""
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+@functools.lru_cache(maxsize=8)
+def _shared_engine(config_folder: str, stamp: tuple) -> "RulesEngine":
+    """Build the engine for a config folder; stamp makes edited configs a cache miss."""
+    return RulesEngine(config_folder)
+
 
 class RulesEngine:
-    """Rules engine for categorization and exclusions."""
+    """Rules engine for categorization and exclusions.
+
+    An engine's state is read-only after construction, so one instance can be
+    shared (see get) and used from several threads.
+    """
 
     def __init__(self, config_folder: str):
         self.config_folder = Path(config_folder)
@@ -17,6 +261,41 @@ class RulesEngine:
         self.custom_rules = self._load_config("rules.yaml")
         self.category_mapping = self._load_config("category_mapping.yaml")
 
+        # Rules are matched on every run; compile their conditions and group them by condition
+        # once. Description patterns are also combined into one alternation so most rows need
+        # a single regex scan
+        self._exclusion_rules = _group_rules([_compile_conditions(exclusion, amounts=False)
+                                              for exclusion in self.exclusions.get('exclusions', [])],
+                                             EQUALITY_FIELDS)
+
+        # Everything except category is fixed up front for custom rules (see apply_custom_rules)
+        custom_rules = self.custom_rules.get('custom_rules', [])
+        self._custom_rules = _group_rules([_compile_conditions(rule.get('conditions', {}))
+                                           for rule in custom_rules],
+                                          ['source', 'type'])
+
+        # Per custom rule: (name, required category or None, category to set or None)
+        self._custom_rule_actions = [
+            (rule.get('name', 'Unknown'), compiled.equals.get('category'),
+             rule.get('action', {}).get('category'))
+            for rule, compiled in zip(custom_rules, self._custom_rules.rules)
+        ]
+
+        # Merchant group patterns in config order (a later match overrides an earlier one)
+        self._merchant_patterns = [
+            (re.compile(pattern, re.IGNORECASE), group_config.get('master_name', group_name))
+            for group_name, group_config in self.custom_rules.get('merchant_groups', {}).items()
+            for pattern in group_config.get('patterns', [])
+        ]
+        self._merchant_prefilter = _combine_patterns([pattern for pattern, _ in self._merchant_patterns])
+
+    @classmethod
+    def get(cls, config_folder: str) -> "RulesEngine":
+        """Return a shared engine for config_folder, rebuilt when any config file changes."""
+        folder = Path(config_folder).resolve()
+        stamp = tuple(_file_stamp(folder / filename) for filename in CONFIG_FILES)
+        return _shared_engine(str(folder), stamp)
+
     def _load_config(self, filename: str) -> Dict[str, Any]:
         """Load configuration file."""
         config_path = self.config_folder / filename
@@ -24,120 +303,129 @@ class RulesEngine:
             print(f"Warning: {config_path} not found, using defaults")
             return {}
 
-        with open(config_path, 'r') as f:
-            return yaml.safe_load(f)
+        stat = config_path.stat()
+        return _load_yaml_cached(str(config_path.resolve()), stat.st_mtime_ns, stat.st_size)
+
+    def _prepare(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Return df with the low-cardinality rule columns as categoricals.
+
+        Equality conditions then compare integer codes instead of strings.
+        df itself is returned when there is nothing to convert.
+        """
+        conversions = {col: df[col].astype('category') for col in EQUALITY_FIELDS
+                       if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype)}
+        return df.assign(**conversions) if conversions else df
 
     def apply_exclusions(self, df: pd.DataFrame) -> pd.DataFrame:
         """Apply exclusion rules to filter out unwanted transactions."""
-        result_df = df.copy()
+        result_df = self._prepare(df)
 
         exclusions = self.exclusions.get('exclusions', [])
+        if not exclusions:
+            return result_df
 
-        for exclusion in exclusions:
-            # Build filter conditions on current dataframe
-            mask = pd.Series([True] * len(result_df), index=result_df.index)
+        matches = _match_rules(result_df, self._exclusion_rules)
 
-            if 'source' in exclusion:
-                mask &= (result_df['source'] == exclusion['source'])
+        # Each excluded row is counted against the first rule it matches
+        excluded = matches.any(axis=1)
+        counts = np.bincount(matches[excluded].argmax(axis=1), minlength=len(exclusions))
 
-            if 'type' in exclusion:
-                mask &= (result_df['type'] == exclusion['type'])
-
-            if 'category' in exclusion:
-                mask &= (result_df['category'] == exclusion['category'])
-
-            if 'description_contains' in exclusion:
-                mask &= result_df['merchant'].str.contains(
-                    exclusion['description_contains'], case=False, na=False
-                )
-
-            # Remove matching transactions
-            excluded_count = mask.sum()
+        for exclusion, excluded_count in zip(exclusions, counts):
             if excluded_count > 0:
                 print(f"Excluded {excluded_count} transactions: {exclusion.get('reason', 'No reason provided')}")
-                result_df = result_df[~mask].reset_index(drop=True)
+
+        # Remove all matching transactions in one pass. take() already copies the kept rows;
+        # relabelling in place avoids reset_index() copying them again
+        if excluded.any():
+            result_df = result_df.take(np.flatnonzero(~excluded))
+            result_df.index = pd.RangeIndex(len(result_df))
 
         return result_df
 
     def apply_custom_rules(self, df: pd.DataFrame) -> pd.DataFrame:
         """Apply custom categorization rules."""
-        result_df = df.copy()
-
-        # Custom rules will override categories directly
-
-        custom_rules = self.custom_rules.get('custom_rules', [])
+        result_df = self._prepare(df)
 
-        for rule in custom_rules:
-            # Build filter conditions
-            mask = pd.Series([True] * len(result_df))
+        # Custom rules override categories by writing category codes; the codes are copied on
+        # the first write, new categories are appended, and the column is rebuilt once at the end.
+        # Later rules see earlier rules' categories
+        category = result_df['category']
+        categories = list(category.cat.categories)
+        category_codes = {value: code for code, value in enumerate(categories)}
+        codes = category.cat.codes.to_numpy()
+        category_changed = False
 
-            conditions = rule.get('conditions', {})
+        # Everything except category is fixed up front, so it's evaluated for all rules together
+        matches = _match_rules(result_df, self._custom_rules)
 
-            if 'source' in conditions:
-                mask &= (result_df['source'] == conditions['source'])
+        for i, (name, required_category, new_category) in enumerate(self._custom_rule_actions):
+            mask = matches[:, i]
 
-            if 'type' in conditions:
-                mask &= (result_df['type'] == conditions['type'])
-
-            if 'category' in conditions:
-                mask &= (result_df['category'] == conditions['category'])
-
-            if 'description_contains' in conditions:
-                mask &= result_df['merchant'].str.contains(
-                    conditions['description_contains'], case=False, na=False
-                )
-
-            if 'amount_min' in conditions:
-                mask &= (result_df['amount'] >= conditions['amount_min'])
-
-            if 'amount_max' in conditions:
-                mask &= (result_df['amount'] <= conditions['amount_max'])
+            if required_category is not None:
+                # Not a category: matches nothing (missing values have code -1)
+                mask = mask & (codes == category_codes.get(required_category, -2))
 
             # Apply actions
             if mask.any():
-                actions = rule.get('action', {})
-
-                if 'category' in actions:
-                    result_df.loc[mask, 'category'] = actions['category']
-
+                if new_category is not None:
+                    if new_category not in category_codes:
+                        category_codes[new_category] = len(categories)
+                        categories.append(new_category)
+                    if not category_changed:
+                        codes = codes.astype(np.int32)  # Copy, with room for added categories
+                        category_changed = True
+                    codes[mask] = category_codes[new_category]
 
                 matched_count = mask.sum()
-                print(f"Applied rule '{rule.get('name', 'Unknown')}' to {matched_count} transactions")
+                print(f"Applied rule '{name}' to {matched_count} transactions")
+
+        if category_changed:
+            result_df = result_df.assign(category=pd.Categorical.from_codes(codes, categories=categories))
 
         return result_df
 
     def apply_category_mapping(self, df: pd.DataFrame) -> pd.DataFrame:
         """Apply category mapping to create master categories."""
-        result_df = df.copy()
-
-        # Initialize master_category column
-        result_df['master_category'] = self.category_mapping.get('default_category', 'Uncategorized')
+        result_df = self._prepare(df)
 
+        default_category = self.category_mapping.get('default_category', 'Uncategorized')
         master_categories = self.category_mapping.get('master_categories', {})
 
-        # Apply mappings based on category
-        for orig_category, master_category in master_categories.items():
-            orig_mask = (result_df['category'] == orig_category)
-            result_df.loc[orig_mask, 'master_category'] = master_category
+        # One lookup per category (category is categorical), gathered by code; unmapped
+        # categories get the default, and so do missing values (code -1 picks the last entry)
+        category = result_df['category']
+        lookup = np.array([master_categories.get(c, default_category) for c in category.cat.categories]
+                          + [default_category], dtype=object)
+        master = pd.Series(lookup[category.cat.codes.to_numpy()], index=result_df.index)
 
-        return result_df
+        # assign() returns a new frame, so the caller's df is left unchanged
+        return result_df.assign(master_category=master)
 
     def apply_merchant_grouping(self, df: pd.DataFrame) -> pd.DataFrame:
         """Apply merchant grouping rules."""
-        result_df = df.copy()
-
         # Initialize merchant_group with original merchant names
-        result_df['merchant_group'] = result_df['merchant']
-
-        merchant_groups = self.custom_rules.get('merchant_groups', {})
-
-        for group_name, group_config in merchant_groups.items():
-            patterns = group_config.get('patterns', [])
-            master_name = group_config.get('master_name', group_name)
-
-            # Apply patterns
-            for pattern in patterns:
-                mask = result_df['merchant'].str.contains(pattern, case=False, na=False)
-                result_df.loc[mask, 'merchant_group'] = master_name
-
-        return result_df
\ No newline at end of file
+        merchant_group = df['merchant'].copy()
+
+        # Merchant names repeat a lot, so patterns are matched once per distinct name
+        codes, uniques = pd.factorize(df['merchant'])
+        names = np.asarray(uniques, dtype=object)
+        groups = names.copy()
+
+        if self._merchant_prefilter is not None:
+            candidates = np.flatnonzero(_search(self._merchant_prefilter, names))
+        else:
+            candidates = np.arange(len(names)) if self._merchant_patterns else []
+
+        for i in candidates:
+            # Last matching pattern wins, as if each pattern were applied in turn
+            for pattern, master_name in reversed(self._merchant_patterns):
+                if pattern.search(names[i]):
+                    groups[i] = master_name
+                    break
+
+        grouped = np.flatnonzero(groups != names)
+        if len(grouped):
+            rows = np.isin(codes, grouped)
+            merchant_group[rows] = groups[codes[rows]]
+
+        return df.assign(merchant_group=merchant_group)
\ No newline at end of file
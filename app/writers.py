@@ -0,0 +1,112 @@
+"""
+Output writers for reports and intermediate data.
+"""
+import numpy as np
+import pandas as pd
+from pathlib import Path
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+    import pyarrow.compute as pc
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+# Characters that make pandas quote a field; Arrow's writer can't quote only those fields
+NEEDS_QUOTING = '[,"\r\n]'
+
+
+def write_csv(df: pd.DataFrame, path: Path) -> None:
+    """Write a DataFrame to CSV (without index), with the same output as DataFrame.to_csv.
+
+    Uses pyarrow's multithreaded writer when available, after formatting
+    floats and booleans the way pandas does. Frames with values that would
+    need quoting, or with column types not handled here, go to to_csv; text
+    columns are converted first so that is usually known before the rest is.
+    """
+    if PYARROW_AVAILABLE:
+        try:
+            csv_bytes = _write_csv_bytes(df)
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError, pa.ArrowTypeError, ValueError):
+            pass
+        else:
+            Path(path).write_bytes(csv_bytes)
+            return
+
+    df.to_csv(path, index=False)
+
+
+def write_parquet(df: pd.DataFrame, path: Path) -> None:
+    """Write a DataFrame to zstd-compressed Parquet (without index)."""
+    df.to_parquet(path, compression='zstd', index=False)
+
+
+def _write_csv_bytes(df: pd.DataFrame) -> bytes:
+    """Render a DataFrame as CSV bytes like to_csv, or raise ValueError if that isn't possible here."""
+    names = [str(name) for name in df.columns]
+    if isinstance(df.columns, pd.MultiIndex) or any(any(c in name for c in ',"\r\n') for name in names):
+        raise ValueError("Column names need quoting")
+    if len(names) < 2:
+        raise ValueError("csv quotes empty fields in single-column rows")
+
+    # Text columns first: they decide whether the Arrow writer can be used at all
+    columns = [None] * len(names)
+    for i in sorted(range(len(names)), key=lambda i: not _is_text(df.iloc[:, i].dtype)):
+        columns[i] = _to_csv_column(df.iloc[:, i])
+    table = pa.Table.from_arrays(columns, names=names)
+
+    sink = pa.BufferOutputStream()
+    pacsv.write_csv(table, sink, pacsv.WriteOptions(include_header=False, quoting_style='none'))
+    header = (','.join(names) + '\n').encode()
+    return header + sink.getvalue().to_pybytes()
+
+
+def _is_text(dtype) -> bool:
+    """Whether a column is written as text (and might need quoting)."""
+    return not (pd.api.types.is_numeric_dtype(dtype) or pd.api.types.is_bool_dtype(dtype) or
+                pd.api.types.is_datetime64_any_dtype(dtype))
+
+
+def _to_csv_column(column: pd.Series):
+    """Convert a column to an Arrow array that Arrow writes the way pandas would."""
+    dtype = column.dtype
+
+    if pd.api.types.is_bool_dtype(dtype):
+        if dtype != np.bool_:
+            raise ValueError("Nullable booleans")
+        return pa.array(np.where(column.to_numpy(), 'True', 'False'))
+
+    if pd.api.types.is_float_dtype(dtype):
+        if not isinstance(dtype, np.dtype):
+            raise ValueError("Nullable or Arrow-backed floats")
+        # pandas formats floats with numpy's shortest repr (e.g. 2949.0, 1e-05, -0.0) and NaN as empty
+        values = column.to_numpy()
+        return pa.array(values.astype(str), mask=np.isnan(values))
+
+    if pd.api.types.is_integer_dtype(dtype):
+        return pa.array(column, from_pandas=True)
+
+    if pd.api.types.is_datetime64_any_dtype(dtype):
+        if getattr(dtype, 'tz', None) is not None:
+            raise ValueError("Timezone-aware timestamps")
+        array = pa.array(column, from_pandas=True)
+        # pandas writes midnight-only timestamps as plain dates
+        if pc.all(pc.equal(pc.floor_temporal(array, unit='day'), array)).as_py() is False:
+            raise ValueError("Timestamps with a time component")
+        return array.cast(pa.date32())
+
+    if isinstance(dtype, pd.CategoricalDtype):
+        if not _is_text(dtype.categories.dtype):
+            raise ValueError("Non-text categories")
+        # Categoricals: write the labels
+        array = pa.array(column, from_pandas=True)
+        array = array.cast(array.type.value_type)
+    else:
+        array = pa.array(column, from_pandas=True)
+
+    if not (pa.types.is_string(array.type) or pa.types.is_large_string(array.type) or pa.types.is_null(array.type)):
+        raise ValueError(f"Unsupported column type {array.type}")
+    if not pa.types.is_null(array.type) and pc.any(pc.match_substring_regex(array, NEEDS_QUOTING)).as_py():
+        raise ValueError("Values need quoting")
+    return array
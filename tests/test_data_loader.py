@@ -7,7 +7,7 @@ import tempfile
 import shutil
 from pathlib import Path
 
-from app.data_loaders import ChaseCheckingLoader, ChaseCreditCardLoader, AppleCardLoader
+from app.data_loaders import ChaseCheckingLoader, ChaseCreditCardLoader, AppleCardLoader, PYARROW_AVAILABLE, _parse_mdy, _prune_cache
 
 
 class TestDataLoaders(unittest.TestCase):
@@ -123,6 +123,74 @@ class TestDataLoaders(unittest.TestCase):
         self.assertEqual(df['source'].iloc[0], 'apple_card_joe')
         self.assertEqual(df['account_owner'].iloc[0], 'joe')
     
+    @unittest.skipUnless(PYARROW_AVAILABLE, "pyarrow not installed")
+    def test_pyarrow_matches_pandas(self):
+        """Test pyarrow and pandas CSV paths produce the same data."""
+        for loader_class, folder in [(ChaseCheckingLoader, "chase_checking"),
+                                     (ChaseCreditCardLoader, "chase_credit")]:
+            arrow_df = loader_class(self.test_path / folder).load_data()
+            pandas_df = loader_class(self.test_path / folder, use_pyarrow=False).load_data()
+            pd.testing.assert_frame_equal(arrow_df, pandas_df.astype(arrow_df.dtypes.to_dict()))
+    
+    @unittest.skipUnless(PYARROW_AVAILABLE, "pyarrow not installed")
+    def test_parquet_cache(self):
+        """Test parsed CSVs are cached and reused."""
+        cache_dir = self.test_path / "cache"
+        first = ChaseCreditCardLoader(self.test_path / "chase_credit", cache_folder=cache_dir).load_data()
+        self.assertEqual(len(list(cache_dir.glob("*.parquet"))), 1)
+        
+        second = ChaseCreditCardLoader(self.test_path / "chase_credit", cache_folder=cache_dir).load_data()
+        pd.testing.assert_frame_equal(first, second)
+        self.assertEqual(len(list(cache_dir.glob("*.parquet"))), 1)
+    
+    @unittest.skipUnless(PYARROW_AVAILABLE, "pyarrow not installed")
+    def test_parquet_cache_pruned(self):
+        """Test cache entries of changed CSVs are removed."""
+        cache_dir = self.test_path / "cache"
+        ChaseCreditCardLoader(self.test_path / "chase_credit", cache_folder=cache_dir).load_data()
+        
+        # Changing the file gives it a new cache key; the old entry is no longer used
+        with open(self.test_path / "chase_credit" / "test_credit.csv", 'a') as f:
+            f.write("06/28/2025,06/30/2025,GROCERY,Groceries,Sale,-20.0\n")
+        loader = ChaseCreditCardLoader(self.test_path / "chase_credit", cache_folder=cache_dir)
+        loader.load_data()
+        self.assertEqual(len(list(cache_dir.glob("*.parquet"))), 2)
+        
+        _prune_cache([loader])
+        self.assertEqual(list(cache_dir.glob("*.parquet")), list(loader.used_cache_paths))
+    
+    @unittest.skipUnless(PYARROW_AVAILABLE, "pyarrow not installed")
+    def test_shared_cache_not_pruned(self):
+        """Test pruning leaves the cache entries of other data folders alone."""
+        cache_dir = self.test_path / "cache"
+        other_folder = self.test_path / "other" / "chase_credit"
+        shutil.copytree(self.test_path / "chase_credit", other_folder)
+        other = ChaseCreditCardLoader(other_folder, cache_folder=cache_dir)
+        other.load_data()
+        
+        loader = ChaseCreditCardLoader(self.test_path / "chase_credit", cache_folder=cache_dir)
+        loader.load_data()
+        _prune_cache([loader])
+        self.assertEqual(set(cache_dir.glob("*.parquet")), loader.used_cache_paths | other.used_cache_paths)
+    
+    def test_source_file_column(self):
+        """Test source_file is only kept when requested."""
+        df = AppleCardLoader(self.test_path / "apple_joe", "Joe").load_data()
+        self.assertFalse('source_file' in df.columns)
+        
+        df = AppleCardLoader(self.test_path / "apple_joe", "Joe", keep_source_file=True).load_data()
+        self.assertEqual(df['source_file'].iloc[0], 'test_apple.csv')
+    
+    def test_parse_mdy(self):
+        """Test vectorized date parsing matches pd.to_datetime."""
+        dates = pd.Series(['06/30/2025', '02/29/2024', '12/01/1999', '01/31/2025'])
+        expected = pd.to_datetime(dates, format='%m/%d/%Y')
+        pd.testing.assert_series_equal(_parse_mdy(dates), expected)
+        
+        # Invalid dates still raise like pd.to_datetime
+        with self.assertRaises(ValueError):
+            _parse_mdy(pd.Series(['02/30/2025']))
+    
     def test_missing_folder(self):
         """Test behavior with missing folder."""
         with self.assertRaises(FileNotFoundError):
@@ -0,0 +1,149 @@
+"""
+Simple tests for the expense processor's summaries.
+"""
+import unittest
+from unittest import mock
+import numpy as np
+import pandas as pd
+import tempfile
+import shutil
+from pathlib import Path
+
+from app import processor as processor_module
+from app.processor import ExpenseProcessor
+
+CONFIG_DIR = Path(__file__).resolve().parent.parent / "app" / "config"
+
+
+class TestExpenseProcessor(unittest.TestCase):
+    """Test that summaries rolled up from the shared aggregate match direct groupbys."""
+    
+    def setUp(self):
+        """Set up a processor and processed test transactions."""
+        self.test_dir = tempfile.mkdtemp()
+        self.processor = ExpenseProcessor(str(CONFIG_DIR), str(Path(self.test_dir) / "output"))
+        
+        rng = np.random.default_rng(0)
+        n = 300
+        df = pd.DataFrame({
+            'date': pd.Timestamp('2025-01-01') + pd.to_timedelta(rng.integers(0, 365, n), unit='D'),
+            'amount': rng.normal(-40, 80, n).round(2),
+            'source': pd.Categorical(rng.choice(['chase_checking', 'chase_credit_card', 'apple_card_joe',
+                                                 'apple_card_nikita'], n)),
+            'master_category': rng.choice(['Groceries', 'Income', 'Shopping', 'Travel'], n),
+            'merchant_group': rng.choice(['Amazon', 'Target', 'Uber', 'Payroll', 'Starbucks'], n)
+        })
+        self.df = self.processor._add_derived_fields(df)
+    
+    def tearDown(self):
+        """Clean up test data."""
+        shutil.rmtree(self.test_dir)
+    
+    def direct_summary(self, keys):
+        """Totals, counts and averages straight from the transactions."""
+        summary = self.df.groupby(keys, observed=True).agg(
+            total_amount=('amount', 'sum'),
+            transaction_count=('amount', 'count'),
+            avg_amount=('amount', 'mean'),
+            total_abs_amount=('abs_amount', 'sum')
+        ).round(2)
+        return summary.reset_index()
+    
+    def assert_same_rows(self, actual, expected, keys):
+        """Compare two summaries regardless of row order and key dtypes."""
+        actual = actual.astype({key: object for key in keys}).sort_values(keys).reset_index(drop=True)
+        expected = expected.astype({key: object for key in keys}).sort_values(keys).reset_index(drop=True)
+        pd.testing.assert_frame_equal(actual, expected[actual.columns], check_dtype=False)
+    
+    def test_category_summary(self):
+        """Test the category summary matches a direct groupby."""
+        keys = ['master_category', 'account_group']
+        self.assert_same_rows(self.processor._create_category_summary(self.df), self.direct_summary(keys), keys)
+    
+    def test_merchant_summary(self):
+        """Test the merchant summary matches a direct groupby."""
+        keys = ['merchant_group', 'account_group']
+        self.assert_same_rows(self.processor._create_merchant_summary(self.df), self.direct_summary(keys), keys)
+    
+    def test_cashflow_summary(self):
+        """Test the cashflow summary matches a direct pivot, with columns in category order."""
+        expected = self.df.pivot_table(index='account_group', columns='transaction_type', values='amount',
+                                       aggfunc='sum', fill_value=0, observed=True).round(2)
+        expected['Net_Cashflow'] = expected['Income'] + expected['Expense']
+        expected = expected.reset_index()
+        expected.columns.name = None
+        
+        cashflow = self.processor.get_cashflow_summary(self.df)
+        cashflow.columns.name = None
+        self.assertEqual(cashflow.columns.tolist(), ['account_group', 'Expense', 'Income', 'Net_Cashflow'])
+        self.assert_same_rows(cashflow, expected, ['account_group'])
+    
+    def test_expense_category_summary(self):
+        """Test expense category totals match a direct groupby of the group's expenses."""
+        sources = ['chase_checking', 'chase_credit_card']
+        expenses = self.df[(self.df['transaction_type'] == 'Expense') & self.df['source'].isin(sources)]
+        expected = expenses.groupby('master_category').agg(
+            amount=('amount', 'sum'),
+            abs_amount=('abs_amount', 'sum')
+        )
+        expected = expected[expected['abs_amount'] > 0].round(2).reset_index()
+        
+        summary = self.processor.get_expense_category_summary(self.df, sources)
+        self.assertTrue(summary['abs_amount'].is_monotonic_decreasing)
+        self.assert_same_rows(summary, expected, ['master_category'])
+    
+    def test_shared_aggregate(self):
+        """Test summaries given a precomputed aggregate match ones that compute their own."""
+        agg = self.processor.compute_aggregates(self.df)
+        pd.testing.assert_frame_equal(self.processor.get_cashflow_summary(self.df, agg),
+                                      self.processor.get_cashflow_summary(self.df))
+        pd.testing.assert_frame_equal(self.processor._create_category_summary(self.df, agg),
+                                      self.processor._create_category_summary(self.df))
+    
+    def test_summary_uses_given_aggregate(self):
+        """Test a summary given an aggregate is built from it rather than from the frame."""
+        agg = self.processor.compute_aggregates(self.df).assign(amount_sum=1.0)
+        cashflow = self.processor.get_cashflow_summary(self.df, agg).set_index('account_group')
+        
+        # Every aggregate row now adds 1, so each total is the number of rows rolled up into it
+        rows = agg.groupby(level=['account_group', 'transaction_type'], observed=True).size()
+        for (group, transaction_type), count in rows.items():
+            self.assertEqual(cashflow.loc[group, transaction_type], count)
+    
+    def test_missing_date(self):
+        """Test a row without a date gets no month and stays out of monthly groupbys."""
+        df = pd.DataFrame({
+            'date': pd.to_datetime(['2025-01-31', None, '2025-02-01']),
+            'amount': [-10.0, -20.0, 30.0],
+            'source': pd.Categorical(['chase_checking'] * 3)
+        })
+        df = self.processor._add_derived_fields(df)
+        
+        self.assertEqual(df['year_month'].isna().tolist(), [False, True, False])
+        self.assertTrue(df['year'].isna().iloc[1] and df['month'].isna().iloc[1])
+        self.assertEqual(self.processor.format_for_output(df)['year_month'].tolist()[::2], ['2025-01', '2025-02'])
+        self.assertTrue(pd.isna(self.processor.format_for_output(df)['year_month'].iloc[1]))
+        self.assertEqual(df.groupby('year_month')['amount'].sum().tolist(), [-10.0, 30.0])
+    
+    def test_derived_fields_leave_input_unchanged(self):
+        """Test derived fields go on a new frame, not the one passed in."""
+        df = self.df[['date', 'amount', 'source']]
+        derived = self.processor._add_derived_fields(df)
+        self.assertEqual(df.columns.tolist(), ['date', 'amount', 'source'])
+        self.assertTrue({'year_month', 'account_group'} <= set(derived.columns))
+    
+    @unittest.skipUnless(processor_module.POLARS_AVAILABLE, "polars not installed")
+    def test_polars_matches_pandas(self):
+        """Test the Polars aggregate and summaries match the pandas ones."""
+        polars_agg = self.processor.compute_aggregates(self.df)
+        polars_cashflow = self.processor.get_cashflow_summary(self.df)
+        with mock.patch.object(processor_module, 'POLARS_AVAILABLE', False):
+            pandas_agg = self.processor.compute_aggregates(self.df)
+            pandas_cashflow = self.processor.get_cashflow_summary(self.df)
+        
+        pd.testing.assert_frame_equal(polars_agg.sort_index(), pandas_agg.sort_index(), check_dtype=False)
+        pd.testing.assert_frame_equal(polars_cashflow, pandas_cashflow)
+
+
+if __name__ == '__main__':
+    unittest.main()
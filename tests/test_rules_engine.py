@@ -9,6 +9,7 @@ import yaml
 from pathlib import Path
 
 from app.rules_engine import RulesEngine
+from app.data_loaders import PYARROW_AVAILABLE
 
 
 class TestRulesEngine(unittest.TestCase):
@@ -116,6 +117,30 @@ class TestRulesEngine(unittest.TestCase):
         with open(self.config_dir / "rules.yaml", 'w') as f:
             yaml.dump(custom_rules, f)
     
+    def test_config_cache(self):
+        """Test parsed configs are reused until the file changes."""
+        first = RulesEngine(str(self.config_dir))
+        second = RulesEngine(str(self.config_dir))
+        self.assertIs(first.category_mapping, second.category_mapping)
+        
+        with open(self.config_dir / "category_mapping.yaml", 'w') as f:
+            yaml.dump({'default_category': 'Other'}, f)
+        
+        third = RulesEngine(str(self.config_dir))
+        self.assertEqual(third.category_mapping, {'default_category': 'Other'})
+    
+    def test_shared_engine(self):
+        """Test RulesEngine.get reuses an engine until a config file changes."""
+        first = RulesEngine.get(str(self.config_dir))
+        self.assertIs(RulesEngine.get(str(self.config_dir)), first)
+        
+        with open(self.config_dir / "exclusions.yaml", 'w') as f:
+            yaml.dump({'exclusions': []}, f)
+        
+        second = RulesEngine.get(str(self.config_dir))
+        self.assertIsNot(second, first)
+        self.assertEqual(second.exclusions, {'exclusions': []})
+    
     def test_exclusions(self):
         """Test exclusion rules comprehensively."""
         rules_engine = RulesEngine(str(self.config_dir))
@@ -183,6 +208,33 @@ class TestRulesEngine(unittest.TestCase):
         # But regular checking transactions should remain
         self.assertIn('C98698 CLOCKWISE DIR DEP', remaining_descriptions)
     
+    @unittest.skipUnless(PYARROW_AVAILABLE, "pyarrow not installed")
+    def test_arrow_string_exclusions(self):
+        """Test missing values in Arrow string columns don't drop rows."""
+        import pyarrow as pa
+        rules_engine = RulesEngine(str(self.config_dir))
+        
+        arrow_df = self.test_df.astype({col: pd.ArrowDtype(pa.string()) for col in ['merchant', 'type', 'category']})
+        arrow_df.loc[4, 'type'] = None  # AMAZON purchase with no type should still remain
+        
+        result_df = rules_engine.apply_exclusions(arrow_df)
+        self.assertEqual(len(result_df), 2)
+        self.assertIn('AMAZON MKTPL*N37EE9E02', result_df['merchant'].tolist())
+    
+    @unittest.skipUnless(PYARROW_AVAILABLE, "pyarrow not installed")
+    def test_arrow_string_multiple_chunks(self):
+        """Test Arrow string columns made of several chunks (as read from large CSVs) are matched."""
+        import pyarrow as pa
+        rules_engine = RulesEngine(str(self.config_dir))
+        
+        merchants = self.test_df['merchant'].tolist()
+        chunked = pa.chunked_array([merchants[:3], merchants[3:]], type=pa.string())
+        arrow_df = self.test_df.assign(merchant=pd.arrays.ArrowExtensionArray(chunked))
+        
+        result_df = rules_engine.apply_exclusions(arrow_df)
+        expected_df = rules_engine.apply_exclusions(self.test_df)
+        self.assertEqual(result_df['merchant'].tolist(), expected_df['merchant'].tolist())
+    
     def test_custom_rules(self):
         """Test custom categorization rules."""
         rules_engine = RulesEngine(str(self.config_dir))
@@ -197,6 +249,46 @@ class TestRulesEngine(unittest.TestCase):
         self.assertEqual(clockwise_row['custom_category'].iloc[0], 'Salary Income')
         self.assertEqual(clockwise_row['flags'].iloc[0], 'primary_income')
     
+    def test_custom_rule_new_category(self):
+        """Test rules can assign categories not present in the categorical column."""
+        rules_engine = RulesEngine(str(self.config_dir))
+        result_df = rules_engine.apply_custom_rules(self.test_df)
+        
+        self.assertIsInstance(result_df['category'].dtype, pd.CategoricalDtype)
+        clockwise_row = result_df[result_df['merchant'].str.contains('CLOCKWISE')]
+        self.assertEqual(clockwise_row['category'].iloc[0], 'Salary Income')
+        self.assertEqual(result_df['category'].iloc[4], 'Shopping')
+    
+    def test_custom_rules_mixed_conditions(self):
+        """Test description, amount and category conditions combine like sequential rules."""
+        with open(self.config_dir / "rules.yaml", 'w') as f:
+            yaml.dump({'custom_rules': [
+                {'name': 'Salary', 'conditions': {'description_contains': 'clockwise'},
+                 'action': {'category': 'Salary Income'}},
+                {'name': 'Large Outflow', 'conditions': {'amount_max': -1000},
+                 'action': {'category': 'Large'}},
+                {'name': 'Large Checking', 'conditions': {'source': 'chase_checking', 'category': 'Large'},
+                 'action': {'category': 'Transfers'}}
+            ]}, f, sort_keys=False)
+        rules_engine = RulesEngine(str(self.config_dir))
+        result_df = rules_engine.apply_custom_rules(self.test_df)
+        
+        self.assertEqual(result_df['category'].tolist()[1:4], ['Transfers', 'Transfers', 'Salary Income'])
+        self.assertTrue(pd.isna(result_df['category'].iloc[0]))
+        self.assertEqual(result_df['category'].iloc[4], 'Shopping')
+    
+    def test_input_not_modified(self):
+        """Test rule application leaves the input frame untouched."""
+        rules_engine = RulesEngine(str(self.config_dir))
+        original = self.test_df.copy()
+        
+        rules_engine.apply_exclusions(self.test_df)
+        rules_engine.apply_custom_rules(self.test_df)
+        rules_engine.apply_category_mapping(self.test_df)
+        rules_engine.apply_merchant_grouping(self.test_df)
+        
+        pd.testing.assert_frame_equal(self.test_df, original)
+    
     def test_category_mapping(self):
         """Test category mapping."""
         rules_engine = RulesEngine(str(self.config_dir))
@@ -228,6 +320,20 @@ class TestRulesEngine(unittest.TestCase):
         amazon_row = result_df[result_df['merchant'].str.contains('AMAZON', case=False, na=False)]
         if len(amazon_row) > 0:
             self.assertEqual(amazon_row['merchant_group'].iloc[0], 'Amazon')
+    
+    def test_merchant_grouping_last_match_wins(self):
+        """Test a later merchant group overrides an earlier one, as with sequential patterns."""
+        with open(self.config_dir / "rules.yaml", 'w') as f:
+            yaml.dump({'merchant_groups': {
+                'Payments': {'patterns': ['payment'], 'master_name': 'Payments'},
+                'Apple': {'patterns': ['APPLE.*PAYMENT'], 'master_name': 'Apple'}
+            }}, f, sort_keys=False)
+        rules_engine = RulesEngine(str(self.config_dir))
+        result_df = rules_engine.apply_merchant_grouping(self.test_df)
+        
+        self.assertEqual(result_df['merchant_group'].tolist(), [
+            'Payments', 'Payments', 'Apple', 'C98698 CLOCKWISE DIR DEP', 'AMAZON MKTPL*N37EE9E02', 'Apple'
+        ])
 
 
 if __name__ == '__main__':
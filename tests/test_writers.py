@@ -0,0 +1,65 @@
+"""
+Simple tests for output writers.
+"""
+import unittest
+import numpy as np
+import pandas as pd
+import tempfile
+import shutil
+from pathlib import Path
+
+from app.writers import PYARROW_AVAILABLE, write_csv, _write_csv_bytes
+
+
+class TestWriteCsv(unittest.TestCase):
+    """Test write_csv produces the same output as DataFrame.to_csv."""
+    
+    def setUp(self):
+        """Set up test data."""
+        self.test_dir = tempfile.mkdtemp()
+        self.test_path = Path(self.test_dir)
+        
+        self.test_df = pd.DataFrame({
+            'amount': [-23426.0, 2949.0, 1e-05, -0.0, np.nan, 1234.5678, 1e20],
+            'is_income': [False, True, True, False, False, True, False],
+            'count': [1, 2, 3, 4, 5, 6, 7],
+            'category': pd.Categorical(['Food', None, 'Travel', 'Food', 'Travel', None, 'Food']),
+            'date': pd.to_datetime(['2025-01-01', None, '2025-01-03', '2025-01-04', '2025-01-05',
+                                    '2025-01-06', '2025-01-07']),
+            'merchant': ['AMAZON', 'Target', None, 'Uber', 'Starbucks', 'Apple', 'Shell']
+        })
+    
+    def tearDown(self):
+        """Clean up test data."""
+        shutil.rmtree(self.test_dir)
+    
+    def assert_matches_to_csv(self, df):
+        """Write df with write_csv and compare with to_csv."""
+        path = self.test_path / "out.csv"
+        write_csv(df, path)
+        self.assertEqual(path.read_text(), df.to_csv(index=False))
+    
+    def test_matches_to_csv(self):
+        """Test float, bool, NaN, categorical and timestamp columns are written like to_csv."""
+        self.assert_matches_to_csv(self.test_df)
+    
+    def test_matches_to_csv_with_times(self):
+        """Test timestamps with a time component are written like to_csv."""
+        df = self.test_df.assign(date=self.test_df['date'] + pd.Timedelta(hours=12))
+        self.assert_matches_to_csv(df)
+    
+    def test_matches_to_csv_with_quoting(self):
+        """Test values that need quoting are written like to_csv."""
+        df = self.test_df.assign(merchant=['AMAZON, INC', 'Say "hi"', None, 'Uber', 'a\nb', 'Apple', 'Shell'])
+        self.assert_matches_to_csv(df)
+    
+    @unittest.skipUnless(PYARROW_AVAILABLE, "pyarrow not installed")
+    def test_arrow_writer_used(self):
+        """Test the Arrow writer handles the common column types itself."""
+        import pyarrow as pa
+        df = self.test_df.assign(merchant=self.test_df['merchant'].astype(pd.ArrowDtype(pa.string())))
+        self.assertEqual(_write_csv_bytes(df).decode(), df.to_csv(index=False))
+
+
+if __name__ == '__main__':
+    unittest.main()